@@ -3,175 +3,395 @@
 # It uses object-oriented programming (OOP) with classes, encapsulation, and inheritance.
 
 import streamlit as st  # Streamlit is a framework to build web apps easily in Python.
-from datetime import datetime, timedelta  # Used for dates, times, and checking expiration.
+import bisect  # Binary search helpers for keeping lists sorted.
+import json  # Used to save the grocery list to disk and load it back.
+import logging  # Used to report a snapshot file that can't be read.
+import os  # Used to swap in the saved file in one step.
+import re  # Used to find runs of backticks when showing item text as code.
+import tempfile  # Gives each save its own temporary file.
+import threading  # A lock keeps sessions from changing the shared list at the same time.
+from datetime import date, datetime, timedelta  # Used for dates, times, and checking expiration.
 from collections import defaultdict  # A special dictionary from the collections module.
 import matplotlib.pyplot as plt  # Imported for plotting (not used in this version).
 
 
 # BaseItem class holds shared attributes for items (name and category).
 class BaseItem:
-    def __init__(self, name, category):
-        self.__name = name  # Private attribute for the name of the item.
-        self.__category = category  # Private attribute for the item's category.
-
-    # Getter for name
-    @property   # @property decorator helps you access private attributes safely.
-    def name(self):
-        return self.__name
+    # __slots__ lists the attributes up front, so instances don't carry a per-object __dict__.
+    __slots__ = ('name', 'category')
 
-    # Getter for category
-    @property   # @property decorator helps you access private attributes safely.
-    def category(self):
-        return self.__category
+    def __init__(self, name, category):
+        self.name = name  # Name of the item.
+        self.category = category  # The item's category.
 
 # GroceryItem class inherits from BaseItem and adds price, bought status, and expiry info.
 class GroceryItem(BaseItem):
+    __slots__ = ('price', 'bought', 'added_on', 'expiry_date', 'expiry_ordinal', 'item_id',
+                 '_expiry_str', '_repr_parts')
+
     def __init__(self, name, category, price=0.0, expiry_date=None):
         super().__init__(name, category)  # super() calls the constructor (__init__) of the parent class (BaseItem) to set the common attributes 'name' and 'category'.
-        self.__price = price  # Private attribute for price.
-        self.__bought = False  # Private attribute to track if item is bought.
-        self.__added_on = datetime.now()  # Store the time the item was added.
-        self.__expiry_date = expiry_date  # Optional expiry date.
+        self.price = price  # Price of the item.
+        self.bought = False  # Tracks if the item is bought.
+        self.added_on = datetime.now()  # Store the time the item was added.
+        self.expiry_date = expiry_date  # Optional expiry date.
+        # Expiry date as a day number, so expiry checks are a plain integer subtraction.
+        self.expiry_ordinal = expiry_date.date().toordinal() if expiry_date else None
+        self.item_id = None  # Number given by the GroceryList the item is added to.
+        # Formatted once here because strftime is slow and the date doesn't change.
+        self._expiry_str = expiry_date.strftime("%Y-%m-%d") if expiry_date else "N/A"
+        # Display text around the status, built on first use. The status is added each
+        # time the item is shown, so marking it as bought never leaves stale text behind.
+        self._repr_parts = None
 
     # Mark the item as bought.
     def mark_as_bought(self):
-        self.__bought = True
-
-    # Check if the item has been bought.
-    def is_bought(self):
-        return self.__bought
-
-    # Check if the item is expiring soon (default: 3 days).
-    def is_expiring_soon(self, days=3):
-        if self.__expiry_date is None:
-            return False  # If there's no expiry date, it can't expire.
-
-        return 0 <= (self.__expiry_date.date() - datetime.now().date()).days <= days
-
-    # Getter for price
-    def get_price(self):
-        return self.__price
-
-    # Getter for expiry date
-    def get_expiry_date(self):
-        return self.__expiry_date
+        self.bought = True
+
+    # Turn the item into a plain dictionary that can be saved as JSON.
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "category": self.category,
+            "price": self.price,
+            "bought": self.bought,
+            "added_on": self.added_on.isoformat(),
+            "expiry_date": self.expiry_date.isoformat() if self.expiry_date else None,
+            "item_id": self.item_id,
+        }
+
+    # Build an item back from a dictionary made by to_dict().
+    # Raises KeyError, TypeError or ValueError if the dictionary isn't a valid item.
+    @classmethod
+    def from_dict(cls, data):
+        name, category, bought = data["name"], data["category"], data["bought"]
+        item_id = data.get("item_id")
+        if not isinstance(name, str) or not isinstance(category, str):
+            raise TypeError("Item name and category must be text")
+        if not isinstance(bought, bool):
+            raise TypeError("Item 'bought' must be true or false")
+        if item_id is not None and (not isinstance(item_id, int) or isinstance(item_id, bool)):
+            raise TypeError("Item id must be a whole number")
+
+        expiry_date = datetime.fromisoformat(data["expiry_date"]) if data["expiry_date"] else None
+        item = cls(name, category, float(data["price"]), expiry_date)
+        item.bought = bought
+        item.added_on = datetime.fromisoformat(data["added_on"])
+        item.item_id = item_id  # Kept so saved purchases can refer to the item.
+        return item
 
     # How the item is displayed when printed.
     def __repr__(self):
-        status = '✅ Bought' if self.__bought else '🕒 Pending'
-        expiry = self.__expiry_date.strftime("%Y-%m-%d") if self.__expiry_date else "N/A"
-        return f"{self.name} ({self.category}) - {status} | ${self.__price:.2f} | Expiry: {expiry}"
+        if self._repr_parts is None:
+            self._repr_parts = (f"{self.name} ({self.category}) - ",
+                                f" | ${self.price:.2f} | Expiry: {self._expiry_str}")
+        head, tail = self._repr_parts
+        return head + ('✅ Bought' if self.bought else '🕒 Pending') + tail
 
 # GroceryList class manages all the grocery items in a list.
 class GroceryList:
     def __init__(self):
         self.__items = []  # Private list of all items.
+        self.__by_name = defaultdict(list)  # Pending items grouped by lowercase name, oldest first.
+        self.__pending = {}  # Pending items in insertion order (dict used as an ordered set).
+        self.__bought = []  # Bought items in the order they were bought.
+        # Items with an expiry date, sorted by expiry day number. The two lists are kept in
+        # step so a date range can be found with a binary search instead of checking every item.
+        self.__expiry_ordinals = []
+        self.__expiry_items = []
+        self.__version = 0  # Goes up on every change, so callers can tell when cached views are stale.
+        self.__next_id = 1  # Number for the next item added, so every item has its own id.
+        self.__by_id = {}  # Items by item_id.
 
     # Add a new item to the list.
     def add_item(self, name, category, price, expiry_date):
         item = GroceryItem(name, category, price, expiry_date)
+        self.__add(item)
+        return item
+
+    # Add items saved with GroceryItem.to_dict(), e.g. from a snapshot file.
+    def load_items(self, item_dicts):
+        for data in item_dicts:
+            self.__add(GroceryItem.from_dict(data))
+
+    # Get all items as plain dictionaries, ready to be saved as JSON.
+    def to_dicts(self):
+        return [item.to_dict() for item in self.__items]
+
+    # Put an item into the list and all of the lookup structures.
+    def __add(self, item):
+        if item.item_id is None:
+            item.item_id = self.__next_id
+        elif item.item_id in self.__by_id:
+            raise ValueError(f"Duplicate item id {item.item_id}")
+        self.__next_id = max(self.__next_id, item.item_id + 1)
+        self.__by_id[item.item_id] = item
         self.__items.append(item)
+        if item.bought:
+            self.__bought.append(item)
+        else:
+            self.__by_name[item.name.lower()].append(item)
+            self.__pending[item] = None
+
+        ordinal = item.expiry_ordinal
+        if ordinal is not None:
+            pos = bisect.bisect_right(self.__expiry_ordinals, ordinal)  # After items with the same date.
+            self.__expiry_ordinals.insert(pos, ordinal)
+            self.__expiry_items.insert(pos, item)
+        self.__version += 1
 
-    # Mark a specific item as bought.
+    # Mark the oldest pending item with the given name as bought.
     def mark_as_bought(self, name):
-        for item in self.__items:
-            if item.name.lower() == name.lower() and not item.is_bought():
-                item.mark_as_bought()
-                return item  # Return the item after updating.
-        return None  # If no item found.
+        candidates = self.__by_name.get(name.lower())
+        if not candidates:
+            return None  # If no pending item with that name.
+        return self.mark_item_as_bought(candidates[0])
+
+    # Mark this exact item as bought (useful when several items share a name).
+    def mark_item_as_bought(self, item):
+        if item not in self.__pending:
+            return None  # Already bought, or not in this list.
+
+        key = item.name.lower()
+        candidates = self.__by_name[key]
+        candidates.remove(item)  # Only searches items with the same name.
+        if not candidates:
+            del self.__by_name[key]
+        del self.__pending[item]
+        self.__bought.append(item)
+        item.mark_as_bought()
+        self.__version += 1
+        return item  # Return the item after updating.
+
+    # Get the item with the given id (raises KeyError if there is none).
+    def get_item(self, item_id):
+        return self.__by_id[item_id]
+
+    # Get the change counter for the list.
+    def get_version(self):
+        return self.__version
 
     # Get items based on bought status: True, False, or None (all).
     def get_items(self, bought=None):
         if bought is None:
             return self.__items
-        return [item for item in self.__items if item.is_bought() == bought]
-
-    # Get all items that are expiring soon.
-    def get_expiring_items(self, days=3, include_bought=True):
-        return [
-            item for item in self.__items
-            if item.is_expiring_soon(days) and (include_bought or not item.is_bought())
-        ]
+        return list(self.__bought) if bought else list(self.__pending)
+
+    # Get all items that are expiring soon, soonest first.
+    def get_expiring_items(self, days=3, include_bought=True, today_ordinal=None):
+        if today_ordinal is None:
+            today_ordinal = date.today().toordinal()
+        lo = bisect.bisect_left(self.__expiry_ordinals, today_ordinal)
+        hi = bisect.bisect_right(self.__expiry_ordinals, today_ordinal + days)
+        if include_bought:
+            return self.__expiry_items[lo:hi]
+        return [item for item in self.__expiry_items[lo:hi] if not item.bought]
 
 # PurchaseHistory class stores past purchases and calculates total spent.
 class PurchaseHistory:
     def __init__(self):
         self.__history = defaultdict(list)  # Dictionary to group items by date.
         self.__total_spent = 0.0  # Private variable to track total spending.
+        self.__total_spent_str = "$0.00"  # Total formatted for display, updated with each purchase.
 
     # Add an item to the purchase history.
-    def record_purchase(self, item):
-        date_str = datetime.now().strftime("%Y-%m-%d")  # Use today's date as key.
+    # 'date_str' is only passed in when restoring saved purchases.
+    def record_purchase(self, item, date_str=None):
+        if date_str is None:
+            date_str = datetime.now().strftime("%Y-%m-%d")  # Use today's date as key.
         self.__history[date_str].append(item)
-        self.__total_spent += item.get_price()  # Add item price to total.
+        self.__total_spent += item.price  # Add item price to total.
+        self.__total_spent_str = f"${self.__total_spent:.2f}"
 
     # Get total money spent so far.
     def get_total_spent(self):
         return self.__total_spent
 
-
+    # Get total money spent so far, formatted like "$12.50".
+    def get_total_spent_str(self):
+        return self.__total_spent_str
+
+    # Turn the history into a plain dictionary that can be saved as JSON.
+    # Items are saved with the grocery list, so each date only lists the ids of its items.
+    def to_dict(self):
+        return {
+            date_str: [item.item_id for item in items]
+            for date_str, items in self.__history.items()
+        }
+
+    # Restore the history from a dictionary made by to_dict(), looking the items up in
+    # 'grocery_list'. The total is worked out again from the items' prices.
+    def load(self, data, grocery_list):
+        for date_str, item_ids in data.items():
+            for item_id in item_ids:
+                self.record_purchase(grocery_list.get_item(item_id), date_str)
+
+# File the grocery list and purchase history are saved to, so they survive app restarts.
+# It lives next to this script (not in whatever folder the app was started from) unless
+# the GROCERY_SNAPSHOT_PATH environment variable points somewhere else.
+SNAPSHOT_PATH = os.environ.get(
+    "GROCERY_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "grocery_snapshot.json"),
+)
+
+# Build the grocery list and purchase history from the snapshot file, or empty ones if
+# nothing was saved yet. If the file can't be read or restored, it is renamed to
+# "<path>.bad-<timestamp>" so the next save doesn't overwrite the household's data,
+# and the app starts empty.
+def restore_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return GroceryList(), PurchaseHistory()
+
+    try:
+        snapshot = json.loads(raw.decode("utf-8"))
+        grocery_list = GroceryList()
+        grocery_list.load_items(snapshot["items"])
+        purchase_history = PurchaseHistory()
+        purchase_history.load(snapshot["purchases"], grocery_list)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        bad_path = f"{path}.bad-{datetime.now():%Y%m%d-%H%M%S}"
+        os.replace(path, bad_path)
+        logging.getLogger(__name__).exception(
+            "Could not restore snapshot %s; moved it to %s and starting empty", path, bad_path
+        )
+        return GroceryList(), PurchaseHistory()
+    return grocery_list, purchase_history
+
+# Save the grocery list and purchase history. Each save writes its own temporary file
+# and then swaps it in, so a crash mid-save can't leave a half-written snapshot behind
+# and saves from different sessions don't trip over each other's temporary files.
+def save_snapshot(grocery_list, purchase_history, path=SNAPSHOT_PATH):
+    snapshot = {"items": grocery_list.to_dicts(), "purchases": purchase_history.to_dict()}
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, prefix=os.path.basename(path) + ".",
+        suffix=".tmp", delete=False
+    ) as f:
+        tmp_path = f.name
+        try:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())  # Make sure the data is on disk before it replaces the old file.
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+
+
+
+# Show text as inline code in markdown, the way st.write does: wrap it in one more backtick
+# than its longest run of backticks, so names like "Tom`s" can't close the code early and
+# turn the rest into markdown. Line breaks become spaces so a name can't start a new line.
+def as_markdown_code(text):
+    text = " ".join(text.splitlines())
+    longest_run = max((len(run) for run in re.findall(r"`+", text)), default=0)
+    fence = "`" * (longest_run + 1)
+    return f"{fence}{text}{fence}"
 
 # Set page title and layout.
 st.set_page_config(page_title="Grocery Tracker", layout="centered")
 
+# Today's date, looked up once per rerun and shared by all expiry checks below.
+_TODAY_ORDINAL = date.today().toordinal()
+
 # Display app title
 st.title("🛒 Grocery Manager & Inventory Tracker")
 
-# Initialize session state objects to keep data across interactions.
-if 'grocery_list' not in st.session_state:
-    st.session_state.grocery_list = GroceryList()
+# Create the grocery list and purchase history once for the whole server, restored from
+# the snapshot file. st.cache_resource hands every session the same objects, so the list
+# is shared by all users.
+@st.cache_resource
+def get_shared_state():
+    return restore_snapshot()
 
-if 'purchase_history' not in st.session_state:
-    st.session_state.purchase_history = PurchaseHistory()
+# One lock for the shared objects above. Hold it while reading or changing them (and while
+# saving the snapshot), since every session runs in its own thread.
+@st.cache_resource
+def get_state_lock():
+    return threading.Lock()
+
+grocery_list, purchase_history = get_shared_state()
+state_lock = get_state_lock()
 
 # Sidebar section for adding new items
 with st.sidebar:
     st.header("➕ Add Grocery Item")
-    name = st.text_input("Item name")  # Text input for item name
-    category = st.text_input("Category")  # Text input for category
-    price = st.number_input("Price", min_value=0.0, step=0.1)  # Price input
-    expiry = st.date_input("Expiry date (optional)")  # Expiry date
+    # A form only reruns the app when it is submitted, not on every keystroke in its inputs.
+    with st.form("add_item", clear_on_submit=True):
+        name = st.text_input("Item name")  # Text input for item name
+        category = st.text_input("Category")  # Text input for category
+        price = st.number_input("Price", min_value=0.0, step=0.1)  # Price input
+        expiry = st.date_input("Expiry date (optional)")  # Expiry date
+        submitted = st.form_submit_button("Add Item")
 
     # When 'Add Item' button is clicked
-    if st.button("Add Item"):
+    if submitted:
         expiry_dt = datetime.combine(expiry, datetime.min.time()) if expiry else None
-        st.session_state.grocery_list.add_item(name, category, price, expiry_dt)
+        with state_lock:
+            grocery_list.add_item(name, category, price, expiry_dt)
+            save_snapshot(grocery_list, purchase_history)
         st.success(f"Added item: {name}")
 
+# Rebuild the pending list and the bought-items text only when the grocery list has changed.
+# Reruns caused by other widgets (e.g. typing in the sidebar) reuse the copies kept in the session.
+with state_lock:
+    list_key = (id(grocery_list), grocery_list.get_version())
+    if st.session_state.get('rendered_list_key') != list_key:
+        st.session_state.pending_items = grocery_list.get_items(bought=False)
+        st.session_state.bought_text = "\n".join(
+            f"- {as_markdown_code(str(item))}" for item in grocery_list.get_items(bought=True)
+        )
+        st.session_state.rendered_list_key = list_key
+
 # Section for pending (not yet bought) items
 st.subheader("📦 Pending Items")
-pending_items = st.session_state.grocery_list.get_items(bought=False)
-i = 0
-while i < len(pending_items):
-    item = pending_items[i]
-    # Add a button to mark each item as bought
-    if st.button(f"✅ Mark as Bought: {item.name}", key=f"buy_{item.name}_{i}"):
-        updated = st.session_state.grocery_list.mark_as_bought(item.name)
-        if updated:
-            st.session_state.purchase_history.record_purchase(updated)
-            st.rerun()  # Refresh the app to update state
-    i += 1
-
-if not pending_items:
+pending_items = st.session_state.pending_items
+if pending_items:
+    # One multiselect plus one button for the whole list, instead of a button per item.
+    # Options are item ids, which stay with the same item even if another session changes
+    # the list; the id is in the label too, since the multiselect matches choices by label.
+    pending_by_id = {item.item_id: item for item in pending_items}
+    to_buy = st.multiselect(
+        "Select items to mark as bought",
+        options=list(pending_by_id),
+        format_func=lambda item_id: f"#{item_id} {pending_by_id[item_id].name} ({pending_by_id[item_id].category})",
+    )
+    if st.button("✅ Mark as Bought", disabled=not to_buy):
+        with state_lock:
+            for item_id in to_buy:
+                item = pending_by_id.get(item_id)
+                # mark_item_as_bought returns None if another session already bought it.
+                updated = grocery_list.mark_item_as_bought(item) if item else None
+                if updated:
+                    purchase_history.record_purchase(updated)
+            save_snapshot(grocery_list, purchase_history)
+        st.rerun()  # Refresh the app to update state
+else:
     st.write("🎉 No pending items!")
 
 # Section for items that have already been bought
 st.subheader("✅ Bought Items")
-bought_items = st.session_state.grocery_list.get_items(bought=True)
-if bought_items:
-    for item in bought_items:
-        st.write("-", item)
+bought_text = st.session_state.bought_text
+if bought_text:
+    st.markdown(bought_text)
 else:
     st.info("No items bought yet.")
 
 # Section for showing expiring soon items (within 3 days)
 st.subheader("⏰ Expiring Soon (within 3 days)")
-expiring_items = st.session_state.grocery_list.get_expiring_items(include_bought=True)
-if expiring_items:
-    for item in expiring_items:
-        days_left = (item.get_expiry_date().date() - datetime.now().date()).days
-        label = f"{item} (Already bought)" if item.is_bought() else str(item)
-
+# Days left and labels are worked out while holding the lock, so an item bought by
+# another session at the same moment is shown consistently.
+with state_lock:
+    expiring = [
+        (item.expiry_ordinal - _TODAY_ORDINAL, f"{item} (Already bought)" if item.bought else str(item))
+        for item in grocery_list.get_expiring_items(include_bought=True, today_ordinal=_TODAY_ORDINAL)
+    ]
+if expiring:
+    for days_left, label in expiring:
         # Show different messages based on days left
         if days_left < 0:
             st.error(f"❌ Expired: {label}")
@@ -186,9 +406,11 @@ else:
 
 # Display total money spent
 st.subheader("💰 Money Spent")
-total = st.session_state.purchase_history.get_total_spent()
+with state_lock:
+    total = purchase_history.get_total_spent()
+    total_str = purchase_history.get_total_spent_str()
 if total > 0:
-    st.write(f"Total spent: **${total:.2f}**")
+    st.write(f"Total spent: **{total_str}**")
 elif total == 0:
     st.write("You haven't spent anything yet.")
 else:
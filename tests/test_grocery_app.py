@@ -0,0 +1,214 @@
+# Tests for the Grocery Manager app.
+# The app is a Streamlit script, so most tests drive it through Streamlit's AppTest, which
+# runs the script the same way `streamlit run` does and lets us click its widgets.
+
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(APP_DIR, "grocery_app.py")
+
+
+# Every test gets its own snapshot file and a fresh shared list.
+@pytest.fixture(autouse=True)
+def snapshot_path(tmp_path, monkeypatch):
+    path = tmp_path / "grocery_snapshot.json"
+    monkeypatch.setenv("GROCERY_SNAPSHOT_PATH", str(path))
+    st.cache_resource.clear()  # The shared list is cached per process, not per AppTest.
+    yield path
+    st.cache_resource.clear()
+
+
+def _import_app():
+    import importlib
+    import sys
+
+    sys.modules.pop("grocery_app", None)
+    importlib.import_module("grocery_app")
+
+
+# Import the app module so its classes can be tested directly. The import runs inside an
+# AppTest run, because importing a Streamlit script outside one leaves Streamlit's layout
+# state behind and breaks later AppTest runs in the same process.
+@pytest.fixture
+def app_module(snapshot_path):
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    AppTest.from_function(_import_app, default_timeout=30).run()
+    return sys.modules["grocery_app"]
+
+
+def start_app():
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def add_item(at, name, category, price, expiry=None):
+    at.sidebar.text_input[0].set_value(name)
+    at.sidebar.text_input[1].set_value(category)
+    at.sidebar.number_input[0].set_value(price)
+    at.sidebar.date_input[0].set_value(expiry or date.today())
+    at.sidebar.button[0].click()
+    at.run()
+    assert not at.exception
+
+
+def buy(at, *labels):
+    for label in labels:
+        at.multiselect[0].select(label)
+    at.run()
+    next(b for b in at.button if "Mark as Bought" in b.label).click()
+    at.run()
+    assert not at.exception
+
+
+def pending_options(at):
+    return at.multiselect[0].options if at.multiselect else []
+
+
+def markdown_text(at):
+    return "\n".join(m.value for m in at.markdown)
+
+
+# --- GroceryList -------------------------------------------------------------------------
+
+def test_mark_as_bought_uses_oldest_pending_item_with_name(app_module):
+    grocery_list = app_module.GroceryList()
+    first = grocery_list.add_item("Milk", "Dairy", 2.0, None)
+    second = grocery_list.add_item("milk", "Organic", 5.0, None)
+
+    assert grocery_list.mark_as_bought("MILK") is first
+    assert grocery_list.mark_as_bought("Milk") is second
+    assert grocery_list.mark_as_bought("Milk") is None
+    assert grocery_list.get_items(bought=False) == []
+    assert grocery_list.get_items(bought=True) == [first, second]
+
+
+def test_mark_item_as_bought_marks_that_exact_item(app_module):
+    grocery_list = app_module.GroceryList()
+    first = grocery_list.add_item("Milk", "Dairy", 2.0, None)
+    second = grocery_list.add_item("Milk", "Organic", 5.0, None)
+
+    assert grocery_list.mark_item_as_bought(second) is second
+    assert grocery_list.mark_item_as_bought(second) is None  # Already bought.
+    assert grocery_list.get_items(bought=False) == [first]
+    assert grocery_list.mark_as_bought("Milk") is first
+
+
+def test_get_expiring_items_returns_window_soonest_first(app_module):
+    grocery_list = app_module.GroceryList()
+    now = datetime.now()
+    items = {
+        days: grocery_list.add_item(f"item {days}", "x", 1.0, now + timedelta(days=days))
+        for days in (5, 0, -1, 3, 1)
+    }
+    grocery_list.add_item("no expiry", "x", 1.0, None)
+    grocery_list.mark_item_as_bought(items[1])
+
+    today = date.today().toordinal()
+    assert grocery_list.get_expiring_items(today_ordinal=today) == [items[0], items[1], items[3]]
+    assert grocery_list.get_expiring_items(include_bought=False, today_ordinal=today) == [items[0], items[3]]
+
+
+def test_repr_shows_current_status(app_module):
+    item = app_module.GroceryItem("Milk", "Dairy", 2.0, None)
+    assert repr(item) == "Milk (Dairy) - 🕒 Pending | $2.00 | Expiry: N/A"
+    item.bought = True
+    assert repr(item) == "Milk (Dairy) - ✅ Bought | $2.00 | Expiry: N/A"
+
+
+def test_as_markdown_code_escapes_backticks(app_module):
+    assert app_module.as_markdown_code("Milk") == "`Milk`"
+    assert app_module.as_markdown_code("Tom`s ``x``") == "```" + "Tom`s ``x``" + "```"
+    assert app_module.as_markdown_code("a\nb") == "`a b`"
+
+
+# --- App ---------------------------------------------------------------------------------
+
+def test_marks_the_selected_item_when_names_match():
+    at = start_app()
+    add_item(at, "Milk", "Dairy", 2.0)
+    add_item(at, "Milk", "Organic", 5.0)
+
+    buy(at, "#2 Milk (Organic)")
+
+    assert pending_options(at) == ["#1 Milk (Dairy)"]
+    assert "Milk (Organic) - ✅ Bought | $5.00" in markdown_text(at)
+    assert "Total spent: **$5.00**" in markdown_text(at)
+
+
+def test_snapshot_round_trip(snapshot_path):
+    at = start_app()
+    add_item(at, "Milk", "Dairy", 2.5)
+    add_item(at, "Eggs", "Dairy", 3.0)
+    buy(at, "#1 Milk (Dairy)")
+
+    snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+    assert [item["item_id"] for item in snapshot["items"]] == [1, 2]
+    assert list(snapshot["purchases"].values()) == [[1]]
+
+    st.cache_resource.clear()  # Simulate a server restart.
+    restarted = start_app()
+    assert pending_options(restarted) == ["#2 Eggs (Dairy)"]
+    assert "Milk (Dairy) - ✅ Bought | $2.50" in markdown_text(restarted)
+    assert "Total spent: **$2.50**" in markdown_text(restarted)
+
+    # New items carry on from the restored ids.
+    add_item(restarted, "Bread", "Bakery", 1.0)
+    assert pending_options(restarted) == ["#2 Eggs (Dairy)", "#3 Bread (Bakery)"]
+
+
+@pytest.mark.parametrize("content", [
+    b"{broken",
+    b"[1, 2]",
+    b'{"items": 5, "purchases": {}}',
+    b'{"items": [{"name": "x"}], "purchases": {}}',
+    b'{"items": [], "purchases": []}',
+    b'{"items": [], "purchases": {"2026-01-01": [7]}}',
+    b'{"items": [{"name": "x", "category": "y", "price": "abc", "bought": false,'
+    b' "added_on": "2026-01-01T00:00:00", "expiry_date": null}], "purchases": {}}',
+    b"\xff\xfe not utf-8",
+])
+def test_bad_snapshot_is_moved_aside(snapshot_path, content):
+    snapshot_path.write_bytes(content)
+
+    at = start_app()
+
+    assert pending_options(at) == []
+    assert "You haven't spent anything yet." in markdown_text(at)
+    assert not snapshot_path.exists()
+    moved = list(snapshot_path.parent.glob(snapshot_path.name + ".bad-*"))
+    assert len(moved) == 1
+    assert moved[0].read_bytes() == content
+
+
+def test_selection_stays_with_item_when_another_session_changes_the_list():
+    session_a = start_app()
+    session_b = start_app()
+    add_item(session_a, "Apple", "Fruit", 1.0)
+    add_item(session_a, "Bread", "Bakery", 2.0)
+    session_a.multiselect[0].select("#2 Bread (Bakery)")
+    session_a.run()
+
+    # Another session adds one item and buys another, so the list keeps the same length.
+    session_b.run()
+    add_item(session_b, "Cheese", "Dairy", 3.0)
+    buy(session_b, "#1 Apple (Fruit)")
+
+    next(b for b in session_a.button if "Mark as Bought" in b.label).click()
+    session_a.run()
+    assert not session_a.exception
+
+    # Session A must never buy an item it didn't pick.
+    bought = markdown_text(session_a)
+    assert "Apple (Fruit) - ✅ Bought" in bought
+    assert "Cheese (Dairy) - ✅ Bought" not in bought
+    assert "#3 Cheese (Dairy)" in pending_options(session_a)